@@ -2,6 +2,7 @@
 
 import { useEffect, useState, useCallback } from 'react';
 import { Trash2, Volume2, Plus, Search } from 'lucide-react';
+import { searchBank } from '@/lib/api';
 
 type Item = { id: number; english: string; tamil: string; transliteration?: string };
 
@@ -26,6 +27,38 @@ function saveLocal(items: Item[]) {
   localStorage.setItem(LS_KEY, JSON.stringify(arr.slice(0, 600)));
 }
 
+// Server search matches anywhere in a word only when every query term has at
+// least this many characters; shorter terms only match word starts there, so
+// those queries are filtered locally instead
+const SUBSTRING_MIN = 3;
+const SEARCH_PAGE_SIZE = 100;
+const MARKS_RE = new RegExp('\\p{M}', 'gu');
+const TERM_RE = new RegExp('[\\u0B80-\\u0BFF]+|(?:(?![\\u0B80-\\u0BFF])[\\p{L}\\p{N}])+', 'gu');
+
+/** Query terms as the server splits them: Tamil runs, and other text diacritic-folded. */
+function searchTerms(q: string): string[] {
+  const folded = q
+    .normalize('NFC')
+    .replace(/[\u200c\u200d]/g, '')
+    .replace(/[^\u0B80-\u0BFF]+/g, (run) => run.normalize('NFKD').replace(MARKS_RE, ''));
+  return folded.match(TERM_RE) ?? [];
+}
+
+function isServerSearchable(q: string) {
+  const terms = searchTerms(q);
+  return terms.length > 0 && terms.every((t) => Array.from(t).length >= SUBSTRING_MIN);
+}
+
+/** Every page of server matches for `q`, in rank order. */
+async function searchAllPages(q: string, token: string): Promise<Item[]> {
+  const out: Item[] = [];
+  for (let page = 1; ; page++) {
+    const r = await searchBank(q, token, page, SEARCH_PAGE_SIZE);
+    out.push(...(r.items as Item[]));
+    if (r.items.length < SEARCH_PAGE_SIZE || out.length >= r.total) return out;
+  }
+}
+
 async function apiAddWord(item: { english: string; tamil: string; transliteration?: string }): Promise<'added' | 'exists'> {
   const atk = getToken();
   const res = await fetch(`${API}/api/bank`, {
@@ -61,6 +94,8 @@ export default function WordsPage() {
   const [items, setItems] = useState<Item[]>([]);
   const [error, setError] = useState<string | null>(null);
   const [filter, setFilter] = useState('');
+  // Server-side matches for `filter`; null means filter locally
+  const [results, setResults] = useState<Item[] | null>(null);
   
   const [showAddModal, setShowAddModal] = useState(false);
   const [newEnglish, setNewEnglish] = useState('');
@@ -96,6 +131,29 @@ export default function WordsPage() {
     };
   }, [loadWords]);
 
+  useEffect(() => {
+    const q = filter.trim();
+    const t = getToken();
+    if (!q || !t || !isServerSearchable(q)) {
+      setResults(null);
+      return;
+    }
+    let cancelled = false;
+    const timer = setTimeout(() => {
+      searchAllPages(q, t)
+        .then((rows) => {
+          if (!cancelled) setResults(rows);
+        })
+        .catch(() => {
+          if (!cancelled) setResults(null);
+        });
+    }, 250);
+    return () => {
+      cancelled = true;
+      clearTimeout(timer);
+    };
+  }, [filter, items]);
+
   const ping = useCallback((freq = 880, dur = 0.06, vol = 0.03) => {
     try {
       const Ctx = (window as any).AudioContext || (window as any).webkitAudioContext;
@@ -135,6 +193,7 @@ export default function WordsPage() {
     });
     if (r.ok) {
       setItems((prev) => prev.filter((w) => w.id !== id));
+      setResults((prev) => prev && prev.filter((w) => w.id !== id));
     }
   };
 
@@ -215,12 +274,16 @@ export default function WordsPage() {
     }
   };
 
-  const filtered = items.filter(
-    (w) =>
-      w.english.toLowerCase().includes(filter.toLowerCase()) ||
-      w.tamil.includes(filter) ||
-      (w.transliteration || '').toLowerCase().includes(filter.toLowerCase())
-  );
+  const matchesFilter = (w: Item) =>
+    w.english.toLowerCase().includes(filter.toLowerCase()) ||
+    w.tamil.includes(filter) ||
+    (w.transliteration || '').toLowerCase().includes(filter.toLowerCase());
+
+  // Unsynced local words (negative ids) are never on the server, so they are
+  // always matched here
+  const filtered = results
+    ? [...items.filter((w) => w.id < 0 && matchesFilter(w)), ...results]
+    : items.filter(matchesFilter);
 
   return (
     <div className="space-y-6">
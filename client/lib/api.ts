@@ -117,3 +117,32 @@ export async function deleteFromBank(id: number, accessToken: string) {
   if (!res.ok) throw new Error(`deleteFromBank failed: ${res.status}`);
   return res.json();
 }
+
+export type BankSearchResponse = {
+  items: SavedWord[];
+  total: number;
+  page: number;
+  perPage: number;
+  query: string;
+};
+
+/** Search the user's bank by English, Tamil or transliteration. Requires login. */
+export async function searchBank(
+  query: string,
+  accessToken: string,
+  page = 1,
+  perPage = 20
+): Promise<BankSearchResponse> {
+  const params = new URLSearchParams({
+    q: query,
+    page: String(page),
+    perPage: String(perPage),
+  });
+  const res = await fetch(`${API_BASE}/api/bank/search?${params}`, {
+    method: "GET",
+    headers: { ...authHeaders(accessToken) },
+    credentials: "include",
+  });
+  if (!res.ok) throw new Error(`searchBank failed: ${res.status}`);
+  return res.json();
+}
@@ -1,6 +1,7 @@
 # app.py
 from datetime import timedelta, datetime, date
 import os, io, re, json
+import click
 from dotenv import load_dotenv
 
 # Load environment variables from .env file
@@ -9,13 +10,23 @@ print(f"DEBUG: GEMINI_API_KEY = {os.environ.get('GEMINI_API_KEY')[:10]}..." if o
 
 from flask import Flask, request, jsonify, current_app
 from flask_cors import CORS
+from werkzeug.middleware.proxy_fix import ProxyFix
 from flask_migrate import Migrate
 from flask_jwt_extended import (
     JWTManager, create_access_token, create_refresh_token,
     jwt_required, get_jwt_identity, set_refresh_cookies,
     unset_jwt_cookies, verify_jwt_in_request
 )
-from models import db, User, SavedWord, Achievement
+from models import (
+    db, User, SavedWord, Achievement,
+    SAVED_WORD_FIELDS, ACHIEVEMENT_FIELDS, select_fields, rows_to_dicts
+)
+from serialization import fast_jsonify, render_json, json_response
+from leaderboard import Leaderboard, METRICS, cohort_for
+from search import SearchIndex
+from ratelimit import RateLimiter, make_store
+from cache import Cache, make_backend
+from transliterate import transliterate_many, resolve_transliteration
 from PIL import Image
 
 def ok_image_type(ct):
@@ -166,10 +177,89 @@ def create_app():
     app.config["GENAI_CLIENT"] = genai_client
     app.config["GEMINI_VISION_MODEL"] = GEMINI_VISION_MODEL
 
+    # Behind N reverse proxies, take the client address from X-Forwarded-For so
+    # anonymous rate limits are per client rather than per proxy
+    TRUSTED_PROXIES = int(os.environ.get("TRUSTED_PROXIES", "0"))
+    if TRUSTED_PROXIES > 0:
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=TRUSTED_PROXIES, x_proto=TRUSTED_PROXIES)
+
+    # Quotas for the model-backed endpoints, per user (or IP when anonymous)
+    limiter = RateLimiter(
+        make_store(os.environ.get("RATE_LIMIT_STORE", "memory")),
+        rates={
+            "identify": os.environ.get("RATE_LIMIT_IDENTIFY", "10/minute"),
+            "translate": os.environ.get("RATE_LIMIT_TRANSLATE", "30/minute"),
+        },
+        concurrency=int(os.environ.get("MODEL_CONCURRENCY", "4")),
+    )
+    app.config["RATE_LIMITER"] = limiter
+
+    # Shared across workers when CACHE_URL points at SQLite or Redis; per-user
+    # responses are only cached then (see cache.py)
+    cache = Cache(
+        make_backend(
+            os.environ.get("CACHE_URL", "memory"),
+            max_entries=int(os.environ.get("CACHE_MAX_ENTRIES", "10000")),
+        ),
+        default_ttl=int(os.environ.get("CACHE_TTL", "300")),
+    )
+    app.config["CACHE"] = cache
+    TRANSLATE_CACHE_TTL = int(os.environ.get("TRANSLATE_CACHE_TTL", str(7 * 24 * 3600)))
+
     if os.environ.get("AUTO_CREATE_DB", "1") == "1":
         with app.app_context():
             db.create_all()
 
+    leaderboard = Leaderboard()
+    app.config["LEADERBOARD"] = leaderboard
+    # Other workers' updates only reach this copy through a rebuild
+    LEADERBOARD_REFRESH_SECONDS = int(os.environ.get("LEADERBOARD_REFRESH_SECONDS", "60"))
+
+    def rebuild_leaderboard():
+        from sqlalchemy import func
+        counts = (
+            db.select(SavedWord.user_id, func.count(SavedWord.id).label("n"))
+            .group_by(SavedWord.user_id)
+            .subquery()
+        )
+        rows = db.session.execute(
+            db.select(
+                User.id, User.created_at, User.current_streak,
+                User.last_activity_date, func.coalesce(counts.c.n, 0),
+            ).outerjoin(counts, counts.c.user_id == User.id)
+        ).all()
+        leaderboard.rebuild(rows)
+
+    def refresh_leaderboard():
+        """Rebuild if due, unless another request is already doing so."""
+        if not leaderboard.begin_refresh(LEADERBOARD_REFRESH_SECONDS):
+            return
+        try:
+            rebuild_leaderboard()
+        finally:
+            leaderboard.end_refresh()
+
+    def sync_streak(user):
+        leaderboard.record_streak(
+            user.id, user.current_streak, user.last_activity_date, user.created_at
+        )
+
+    def sync_words(user_id, created_at=None):
+        count = SavedWord.query.filter_by(user_id=user_id).count()
+        leaderboard.record_words(int(user_id), count, created_at)
+
+    try:
+        with app.app_context():
+            rebuild_leaderboard()
+    except Exception as e:
+        print("[Leaderboard] Rebuild failed:", e)
+
+    search_index = None
+    try:
+        search_index = SearchIndex(app)
+    except Exception as e:
+        print("[Search] Init failed:", e)
+
     @app.errorhandler(400)
     def bad_request(e):
         return jsonify({"message": "Bad request", "detail": str(e)}), 400
@@ -190,6 +280,14 @@ def create_app():
     def healthz():
         return {"ok": True}, 200
 
+    @app.get("/healthz/limits")
+    def limiter_stats():
+        return jsonify(limiter.stats()), 200
+
+    @app.get("/healthz/cache")
+    def cache_stats():
+        return jsonify(cache.stats()), 200
+
     # ========== AUTH ==========
     @app.post("/auth/register")
     def register():
@@ -324,20 +422,29 @@ def create_app():
     @jwt_required(optional=True)
     def get_bank():
         uid = get_jwt_identity()
-        items = []
-        if uid:
-            rows = (
-                SavedWord.query
-                .filter_by(user_id=uid)
+        if not uid:
+            return fast_jsonify({
+                "items": [],
+                "myListCount": 0,
+                "defaultCount": DEFAULT_BANK_COUNT
+            }), 200
+
+        def render():
+            rows = db.session.execute(
+                select_fields(SAVED_WORD_FIELDS)
+                .where(SavedWord.user_id == uid)
                 .order_by(SavedWord.created_at.desc())
-                .limit(600).all()
-            )
-            items = [w.to_dict() for w in rows]
-        return jsonify({
-            "items": items,
-            "myListCount": len(items),
-            "defaultCount": DEFAULT_BANK_COUNT
-        }), 200
+                .limit(600)
+            ).all()
+            items = rows_to_dicts(SAVED_WORD_FIELDS, rows)
+            return render_json({
+                "items": items,
+                "myListCount": len(items),
+                "defaultCount": DEFAULT_BANK_COUNT
+            })
+
+        body = cache.get_or_set(f"bank:{uid}", "list", render, shared_only=True)
+        return json_response(body), 200
 
     @app.post("/api/bank")
     @jwt_required()
@@ -346,7 +453,7 @@ def create_app():
         data = request.get_json(silent=True) or {}
         english = (data.get("english") or "").strip()
         tamil = (data.get("tamil") or "").strip()
-        translit = (data.get("transliteration") or None)
+        translit = resolve_transliteration(tamil, data.get("transliteration") or None)
         if not english or not tamil:
             return jsonify({"message": "english and tamil required"}), 400
 
@@ -370,9 +477,40 @@ def create_app():
         if user:
             check_achievements(user)
             db.session.commit()
+            sync_words(user.id, user.created_at)
         
         return jsonify({"status": "added", "id": row.id}), 201
 
+    @app.get("/api/bank/search")
+    @jwt_required()
+    def search_bank():
+        uid = get_jwt_identity()
+        q = (request.args.get("q") or "").strip()
+        page = max(request.args.get("page", 1, type=int), 1)
+        per_page = min(max(request.args.get("perPage", 20, type=int), 1), 100)
+
+        if not q:
+            return jsonify({"message": "q required"}), 400
+        if search_index is None:
+            return jsonify({"message": "Search unavailable"}), 503
+
+        ids, total = search_index.search(uid, q, limit=per_page, offset=(page - 1) * per_page)
+        items = []
+        if ids:
+            rows = db.session.execute(
+                select_fields(SAVED_WORD_FIELDS).where(SavedWord.id.in_(ids))
+            ).all()
+            by_id = {r.id: r for r in rows}
+            items = rows_to_dicts(SAVED_WORD_FIELDS, [by_id[i] for i in ids if i in by_id])
+
+        return fast_jsonify({
+            "items": items,
+            "total": total,
+            "page": page,
+            "perPage": per_page,
+            "query": q
+        }), 200
+
     @app.delete("/api/bank/<int:wid>")
     @jwt_required()
     def delete_bank(wid):
@@ -382,6 +520,7 @@ def create_app():
             return jsonify({"message": "not found"}), 404
         db.session.delete(row)
         db.session.commit()
+        sync_words(uid)
         return jsonify({"status": "deleted"}), 200
 
     # ========== STREAK & STATS ==========
@@ -389,46 +528,55 @@ def create_app():
     @jwt_required()
     def get_stats():
         uid = get_jwt_identity()
-        user = User.query.get(uid)
-        if not user:
+
+        def render():
+            user = User.query.get(uid)
+            if not user:
+                return None
+        
+            word_count = SavedWord.query.filter_by(user_id=uid).count()
+            achievements = db.session.execute(
+                select_fields(ACHIEVEMENT_FIELDS).where(Achievement.user_id == uid)
+            ).all()
+        
+            # Calculate accuracy from flashcard reviews
+            from sqlalchemy import func
+            total_reviews, total_correct = db.session.execute(
+                db.select(
+                    func.coalesce(func.sum(SavedWord.review_count), 0),
+                    func.coalesce(func.sum(SavedWord.correct_count), 0),
+                ).where(SavedWord.user_id == uid, SavedWord.review_count > 0)
+            ).one()
+            accuracy = round((total_correct / total_reviews * 100) if total_reviews > 0 else 0)
+        
+            # Get words learned per week (last 12 weeks)
+            weeks_data = db.session.query(
+                func.strftime('%Y-%W', SavedWord.created_at).label('week'),
+                func.count(SavedWord.id).label('count')
+            ).filter(
+                SavedWord.user_id == uid,
+                SavedWord.created_at >= datetime.utcnow() - timedelta(weeks=12)
+            ).group_by('week').order_by('week').all()
+        
+            weekly_progress = [{"week": w.week, "words": w.count} for w in weeks_data]
+        
+            return render_json({
+                "currentStreak": user.current_streak,
+                "longestStreak": user.longest_streak,
+                "totalScans": user.total_scans,
+                "totalQuizzes": user.total_quizzes,
+                "totalWords": word_count,
+                "accuracy": accuracy,
+                "lastActivityDate": user.last_activity_date,
+                "achievements": rows_to_dicts(ACHIEVEMENT_FIELDS, achievements),
+                "weeklyProgress": weekly_progress
+            })
+
+        # Short TTL: the weekly window moves even without writes
+        body = cache.get_or_set(f"stats:{uid}", "summary", render, ttl=60, shared_only=True)
+        if body is None:
             return jsonify({"message": "User not found"}), 404
-        
-        word_count = SavedWord.query.filter_by(user_id=uid).count()
-        achievements = Achievement.query.filter_by(user_id=uid).all()
-        
-        # Calculate accuracy from flashcard reviews
-        words_with_reviews = SavedWord.query.filter(
-            SavedWord.user_id == uid,
-            SavedWord.review_count > 0
-        ).all()
-        
-        total_reviews = sum(w.review_count for w in words_with_reviews)
-        total_correct = sum(w.correct_count for w in words_with_reviews)
-        accuracy = round((total_correct / total_reviews * 100) if total_reviews > 0 else 0)
-        
-        # Get words learned per week (last 12 weeks)
-        from sqlalchemy import func
-        weeks_data = db.session.query(
-            func.strftime('%Y-%W', SavedWord.created_at).label('week'),
-            func.count(SavedWord.id).label('count')
-        ).filter(
-            SavedWord.user_id == uid,
-            SavedWord.created_at >= datetime.utcnow() - timedelta(weeks=12)
-        ).group_by('week').order_by('week').all()
-        
-        weekly_progress = [{"week": w.week, "words": w.count} for w in weeks_data]
-        
-        return jsonify({
-            "currentStreak": user.current_streak,
-            "longestStreak": user.longest_streak,
-            "totalScans": user.total_scans,
-            "totalQuizzes": user.total_quizzes,
-            "totalWords": word_count,
-            "accuracy": accuracy,
-            "lastActivityDate": user.last_activity_date.isoformat() if user.last_activity_date else None,
-            "achievements": [a.to_dict() for a in achievements],
-            "weeklyProgress": weekly_progress
-        }), 200
+        return json_response(body), 200
 
     @app.post("/api/activity/scan")
     @jwt_required()
@@ -442,6 +590,7 @@ def create_app():
         user.update_streak()
         check_achievements(user)
         db.session.commit()
+        sync_streak(user)
         
         return jsonify({
             "currentStreak": user.current_streak,
@@ -460,12 +609,59 @@ def create_app():
         user.update_streak()
         check_achievements(user)
         db.session.commit()
+        sync_streak(user)
         
         return jsonify({
             "currentStreak": user.current_streak,
             "totalQuizzes": user.total_quizzes
         }), 200
 
+    # ========== LEADERBOARD ==========
+    @app.get("/api/leaderboard")
+    @jwt_required()
+    def get_leaderboard():
+        uid = int(get_jwt_identity())
+        metric = request.args.get("metric", "streak")
+        scope = request.args.get("scope", "global")
+        limit = min(max(request.args.get("limit", 10, type=int), 1), 100)
+        offset = max(request.args.get("offset", 0, type=int), 0)
+
+        if metric not in METRICS:
+            return jsonify({"message": f"metric must be one of {', '.join(METRICS)}"}), 400
+
+        cohort = None
+        if scope == "cohort":
+            cohort = request.args.get("cohort")
+            if not cohort:
+                cohort = leaderboard.cohort_of(uid)
+                if not cohort:
+                    user = User.query.get(uid)
+                    cohort = cohort_for(user.created_at) if user else None
+            if not cohort:
+                return jsonify({"message": "cohort required"}), 400
+        elif scope != "global":
+            return jsonify({"message": "scope must be global or cohort"}), 400
+
+        refresh_leaderboard()
+        leaderboard.maybe_rollover()
+        entries = leaderboard.top(metric, limit, offset, cohort)
+        names = {}
+        if entries:
+            names = dict(db.session.execute(
+                db.select(User.id, User.name)
+                .where(User.id.in_([e["userId"] for e in entries]))
+            ).all())
+        for e in entries:
+            e["name"] = names.get(e["userId"])
+
+        return fast_jsonify({
+            "metric": metric,
+            "scope": scope,
+            "cohort": cohort,
+            "entries": entries,
+            "me": leaderboard.rank_of(metric, uid, cohort)
+        }), 200
+
     # ========== FLASHCARD REVIEW ==========
     @app.get("/api/flashcards/due")
     @jwt_required()
@@ -473,17 +669,19 @@ def create_app():
         uid = get_jwt_identity()
         now = datetime.utcnow()
         
-        words = SavedWord.query.filter(
-            SavedWord.user_id == uid,
-            db.or_(
-                SavedWord.next_review == None,
-                SavedWord.next_review <= now
-            )
-        ).order_by(SavedWord.difficulty.desc()).limit(20).all()
+        rows = db.session.execute(
+            select_fields(SAVED_WORD_FIELDS).where(
+                SavedWord.user_id == uid,
+                db.or_(
+                    SavedWord.next_review == None,
+                    SavedWord.next_review <= now
+                )
+            ).order_by(SavedWord.difficulty.desc()).limit(20)
+        ).all()
         
-        return jsonify({
-            "flashcards": [w.to_dict() for w in words],
-            "total": len(words)
+        return fast_jsonify({
+            "flashcards": rows_to_dicts(SAVED_WORD_FIELDS, rows),
+            "total": len(rows)
         }), 200
 
     @app.post("/api/flashcards/<int:word_id>/review")
@@ -516,6 +714,7 @@ def create_app():
         if user:
             user.update_streak()
             db.session.commit()
+            sync_streak(user)
         
         return jsonify({
             "status": "reviewed",
@@ -524,6 +723,7 @@ def create_app():
 
     # ========== AI IDENTIFY ==========
     @app.post("/api/identify")
+    @limiter.limit("identify")
     def api_identify():
         genai_client = current_app.config.get("GENAI_CLIENT")
         vision_model = current_app.config.get("GEMINI_VISION_MODEL", "gemini-2.0-flash")
@@ -561,7 +761,8 @@ def create_app():
             pos = (item.get("partOfSpeech") or None)
             conf = clamp01(item.get("confidence", 0))
 
-            if (not tamil or not translit) and english:
+            # Transliteration is derived locally; only a missing Tamil word needs the model again
+            if not tamil and english:
                 try:
                     tresp = genai_client.models.generate_content(
                         model=vision_model,
@@ -578,6 +779,7 @@ def create_app():
                     translit = (tdata.get("transliteration") or translit).strip()
                 except Exception:
                     pass
+            translit = resolve_transliteration(tamil, translit)
 
             # Log scan activity if authenticated
             try:
@@ -590,6 +792,7 @@ def create_app():
                         user.update_streak()
                         check_achievements(user)
                         db.session.commit()
+                        sync_streak(user)
             except:
                 pass
 
@@ -606,20 +809,29 @@ def create_app():
             return jsonify({"detail": f"Vision error: {e}"}), 502
 
     # ========== AI TRANSLATE ==========
+    def translate_cache_key(text):
+        return " ".join(text.casefold().split())
+
+    def cached_translation():
+        text = ((request.get_json(silent=True) or {}).get("text") or "").strip()
+        body = cache.get("translate", translate_cache_key(text)) if text else None
+        return json_response(body) if body is not None else None
+
     @app.post("/api/translate")
+    @limiter.limit("translate", cached=cached_translation)
     def api_translate():
         genai_client = current_app.config.get("GENAI_CLIENT")
         vision_model = current_app.config.get("GEMINI_VISION_MODEL", "gemini-2.0-flash")
 
-        if genai_client is None:
-            return jsonify({"detail": "Translation unavailable: GEMINI_API_KEY not set"}), 502
-
         data = request.get_json(silent=True) or {}
         text = (data.get("text") or "").strip()
         
         if not text:
             return jsonify({"detail": "Missing 'text' field"}), 400
 
+        if genai_client is None:
+            return jsonify({"detail": "Translation unavailable: GEMINI_API_KEY not set"}), 502
+
         try:
             from google.genai import types
             resp = genai_client.models.generate_content(
@@ -636,23 +848,58 @@ def create_app():
             result = extract_json_loose(resp.text or "{}")
             
             tamil = (result.get("tamil") or "").strip()
-            translit = (result.get("transliteration") or "").strip()
+            translit = resolve_transliteration(tamil, (result.get("transliteration") or "").strip())
             english = (result.get("english") or text).strip()
             
             if not tamil:
                 return jsonify({"detail": "Translation failed - no Tamil output"}), 500
             
-            return jsonify({
+            body = render_json({
                 "tamil": tamil,
                 "transliteration": translit,
                 "english": english,
                 "confidence": 1.0
             })
+            cache.set("translate", translate_cache_key(text), body, ttl=TRANSLATE_CACHE_TTL)
+            return json_response(body)
 
         except Exception as e:
             print("[/api/translate ERROR]", e)
             return jsonify({"detail": f"Translation error: {e}"}), 502
 
+    # ========== CLI ==========
+    @app.cli.command("backfill-transliterations")
+    @click.option("--all", "all_rows", is_flag=True,
+                  help="Recompute every row, not only those missing a transliteration.")
+    @click.option("--batch-size", default=500, show_default=True)
+    def backfill_transliterations(all_rows, batch_size):
+        """Fill SavedWord.transliteration from the local ISO 15919 engine"""
+        q = db.session.query(
+            SavedWord.id, SavedWord.user_id, SavedWord.tamil, SavedWord.transliteration
+        )
+        if not all_rows:
+            q = q.filter(db.or_(SavedWord.transliteration == None, SavedWord.transliteration == ""))
+        rows = q.order_by(SavedWord.id).all()
+
+        updated = 0
+        for start in range(0, len(rows), batch_size):
+            batch = rows[start:start + batch_size]
+            values = transliterate_many(r.tamil for r in batch)
+            changed = [(r, t) for r, t in zip(batch, values) if t and t != r.transliteration]
+            if changed:
+                db.session.execute(
+                    db.update(SavedWord),
+                    [{"id": r.id, "transliteration": t} for r, t in changed],
+                )
+                # Bulk updates skip mapper and session events, so refresh the
+                # search index and caches here
+                if search_index is not None:
+                    search_index.reindex(db.session.connection(), [r.id for r, _ in changed])
+                db.session.commit()
+                cache.invalidate(*{f"bank:{r.user_id}" for r, _ in changed})
+                updated += len(changed)
+        click.echo(f"Checked {len(rows)} words, updated {updated}.")
+
     return app
 
 app = create_app()
@@ -0,0 +1,377 @@
+# cache.py
+"""Response/result cache shared across gunicorn workers.
+
+`Cache` stores bytes under namespaced keys with a TTL on top of a pluggable
+backend, chosen with CACHE_URL:
+
+    memory (default)      in-process LRU, one copy per worker
+    sqlite:///path.db     file shared by the workers on one host
+    redis://host:port/0   anything that speaks the Redis protocol
+
+Each namespace (e.g. "bank:42") has a random token that is part of every key
+in it; invalidating the namespace just replaces the token, so stale entries
+are never read again and age out through TTLs and size limits. Namespace
+tokens are themselves ordinary cache entries: if one is evicted, a fresh token
+is issued and the old entries are orphaned, never resurrected.
+
+Commits touching SavedWord, User or Achievement rows invalidate the affected
+users' namespaces (see the session hooks at the bottom). An invalidation only
+reaches the backend of the process that made the write, so namespaces that
+are invalidated (`get_or_set(..., shared_only=True)`) are cached only when
+the backend is shared; with the memory backend they are always recomputed,
+and it holds only data that never goes stale, such as translations.
+"""
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from urllib.parse import urlsplit
+
+from flask import current_app, has_app_context
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from models import SavedWord, User, Achievement
+
+
+class RespError(Exception):
+    pass
+
+
+class MemoryBackend:
+    shared = False
+
+    def __init__(self, max_entries=10000):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._data = OrderedDict()  # key -> (value, expires or None)
+
+    def get(self, key):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            value, expires = item
+            if expires is not None and expires <= time.time():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl=None):
+        expires = time.time() + ttl if ttl else None
+        with self._lock:
+            self._data[key] = (value, expires)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+
+class SQLiteBackend:
+    """Shared file cache; evicts expired, then oldest-written entries past max_entries."""
+
+    SWEEP_EVERY = 500
+    shared = True
+
+    def __init__(self, path, max_entries=10000):
+        self.path = path
+        self.max_entries = max_entries
+        self._local = threading.local()
+        self._sets = 0
+        self._conn().execute(
+            "CREATE TABLE IF NOT EXISTS cache_entries "
+            "(key TEXT PRIMARY KEY, value BLOB NOT NULL, expires REAL, stored REAL NOT NULL)"
+        )
+        self._conn().execute(
+            "CREATE INDEX IF NOT EXISTS ix_cache_entries_stored ON cache_entries (stored)"
+        )
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, key):
+        row = self._conn().execute(
+            "SELECT value FROM cache_entries WHERE key = ? AND (expires IS NULL OR expires > ?)",
+            (key, time.time()),
+        ).fetchone()
+        return bytes(row[0]) if row else None
+
+    def set(self, key, value, ttl=None):
+        now = time.time()
+        conn = self._conn()
+        conn.execute(
+            "INSERT OR REPLACE INTO cache_entries (key, value, expires, stored) VALUES (?, ?, ?, ?)",
+            (key, value, now + ttl if ttl else None, now),
+        )
+        self._sets += 1
+        if self._sets % self.SWEEP_EVERY == 0:
+            self._sweep(conn, now)
+
+    def _sweep(self, conn, now):
+        conn.execute("DELETE FROM cache_entries WHERE expires IS NOT NULL AND expires <= ?", (now,))
+        (count,) = conn.execute("SELECT count(*) FROM cache_entries").fetchone()
+        if count > self.max_entries:
+            conn.execute(
+                "DELETE FROM cache_entries WHERE key IN "
+                "(SELECT key FROM cache_entries ORDER BY stored LIMIT ?)",
+                (count - self.max_entries,),
+            )
+
+    def delete(self, key):
+        self._conn().execute("DELETE FROM cache_entries WHERE key = ?", (key,))
+
+
+class RedisBackend:
+    """Minimal RESP2 client (GET/SET/DEL); size limits are the server's maxmemory policy."""
+
+    shared = True
+
+    def __init__(self, host="localhost", port=6379, db=0, password=None, timeout=1.0):
+        self.host, self.port, self.db = host, port, db
+        self.password = password
+        self.timeout = timeout
+        self._local = threading.local()
+
+    @classmethod
+    def from_url(cls, url, **kwargs):
+        parts = urlsplit(url)
+        db = int(parts.path.lstrip("/") or 0)
+        return cls(parts.hostname or "localhost", parts.port or 6379, db, parts.password, **kwargs)
+
+    def _connect(self):
+        sock = socket.create_connection((self.host, self.port), timeout=self.timeout)
+        reader = sock.makefile("rb")
+        try:
+            if self.password:
+                self._call(sock, reader, "AUTH", self.password)
+            if self.db:
+                self._call(sock, reader, "SELECT", self.db)
+        except BaseException:
+            # Never keep a connection that is unauthenticated or on the wrong db
+            reader.close()
+            sock.close()
+            raise
+        self._local.sock, self._local.reader = sock, reader
+
+    def _close(self):
+        sock = getattr(self._local, "sock", None)
+        if sock is not None:
+            try:
+                self._local.reader.close()
+                sock.close()
+            except OSError:
+                pass
+        self._local.sock = self._local.reader = None
+
+    def _call(self, sock, reader, *args):
+        parts = [b"*%d\r\n" % len(args)]
+        for a in args:
+            if not isinstance(a, bytes):
+                a = str(a).encode("utf-8")
+            parts.append(b"$%d\r\n%s\r\n" % (len(a), a))
+        sock.sendall(b"".join(parts))
+        return self._read(reader)
+
+    def _read(self, reader):
+        line = reader.readline()
+        if not line.endswith(b"\r\n"):
+            raise ConnectionError("Connection closed by cache server")
+        kind, body = line[:1], line[1:-2]
+        if kind == b"+":
+            return body
+        if kind == b"-":
+            raise RespError(body.decode("utf-8", "replace"))
+        if kind == b":":
+            return int(body)
+        if kind == b"$":
+            n = int(body)
+            if n < 0:
+                return None
+            return reader.read(n + 2)[:-2]
+        if kind == b"*":
+            n = int(body)
+            return None if n < 0 else [self._read(reader) for _ in range(n)]
+        raise RespError(f"Unexpected reply: {line!r}")
+
+    def command(self, *args):
+        if getattr(self._local, "sock", None) is None:
+            self._connect()
+        try:
+            return self._call(self._local.sock, self._local.reader, *args)
+        except OSError:
+            self._close()
+            raise
+
+    def get(self, key):
+        return self.command("GET", key)
+
+    def set(self, key, value, ttl=None):
+        if ttl:
+            self.command("SET", key, value, "PX", int(ttl * 1000))
+        else:
+            self.command("SET", key, value)
+
+    def delete(self, key):
+        self.command("DEL", key)
+
+
+def make_backend(url, max_entries=10000):
+    if not url or url == "memory":
+        return MemoryBackend(max_entries)
+    if url.startswith("sqlite:///"):
+        return SQLiteBackend(url[len("sqlite:///"):], max_entries)
+    if url.startswith("redis://"):
+        return RedisBackend.from_url(url)
+    raise ValueError(f"Unsupported CACHE_URL: {url!r}")
+
+
+_BACKEND_ERRORS = (OSError, sqlite3.Error, RespError)
+
+
+class Cache:
+    def __init__(self, backend, prefix="ll", default_ttl=300, max_value_bytes=1 << 20):
+        self.backend = backend
+        self.prefix = prefix
+        self.default_ttl = default_ttl
+        self.max_value_bytes = max_value_bytes
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "sets": 0, "invalidations": 0, "errors": 0}
+
+    def _count(self, field):
+        with self._lock:
+            self._stats[field] += 1
+
+    def _ns_key(self, ns):
+        return f"{self.prefix}:ns:{ns}"
+
+    def _token(self, ns):
+        token = self.backend.get(self._ns_key(ns))
+        if token is None:
+            token = uuid.uuid4().hex[:12].encode()
+            self.backend.set(self._ns_key(ns), token)
+        return token.decode()
+
+    def _key(self, ns, token, key):
+        return f"{self.prefix}:{ns}:{token}:{key}"
+
+    def _lookup(self, ns, key):
+        """(namespace token, cached value); (None, None) if the backend failed"""
+        try:
+            token = self._token(ns)
+            value = self.backend.get(self._key(ns, token, key))
+        except _BACKEND_ERRORS as e:
+            print("[Cache] get failed:", e)
+            self._count("errors")
+            return None, None
+        self._count("hits" if value is not None else "misses")
+        return token, value
+
+    def _store(self, ns, token, key, value, ttl):
+        if len(value) > self.max_value_bytes:
+            return
+        try:
+            self.backend.set(self._key(ns, token, key), value, ttl or self.default_ttl)
+            self._count("sets")
+        except _BACKEND_ERRORS as e:
+            print("[Cache] set failed:", e)
+            self._count("errors")
+
+    def get(self, ns, key):
+        return self._lookup(ns, key)[1]
+
+    def set(self, ns, key, value, ttl=None):
+        """Store under the namespace's current token.
+
+        Only for namespaces that are never invalidated: a value computed before
+        an invalidation would be filed under the new token. Use `get_or_set`
+        for the rest.
+        """
+        try:
+            token = self._token(ns)
+        except _BACKEND_ERRORS as e:
+            print("[Cache] set failed:", e)
+            self._count("errors")
+            return
+        self._store(ns, token, key, value, ttl)
+
+    @property
+    def shared(self):
+        return self.backend.shared
+
+    def get_or_set(self, ns, key, compute, ttl=None, shared_only=False):
+        """Cached bytes for `key`, else `compute()`, stored unless it returns None.
+
+        The value is stored under the token it was looked up with, so if `ns`
+        is invalidated while `compute()` runs the new entry is orphaned rather
+        than served as current. With `shared_only`, a per-process backend is
+        bypassed, since other workers' writes could not invalidate it.
+        """
+        if shared_only and not self.shared:
+            return compute()
+        token, value = self._lookup(ns, key)
+        if value is not None:
+            return value
+        value = compute()
+        if value is not None and token is not None:
+            self._store(ns, token, key, value, ttl)
+        return value
+
+    def invalidate(self, *namespaces):
+        for ns in namespaces:
+            try:
+                self.backend.delete(self._ns_key(ns))
+                self._count("invalidations")
+            except _BACKEND_ERRORS as e:
+                print("[Cache] invalidate failed:", e)
+                self._count("errors")
+
+    def stats(self):
+        with self._lock:
+            return {"backend": type(self.backend).__name__, "shared": self.shared, **self._stats}
+
+
+# ---- invalidation hooks on model writes ----
+def namespaces_for(obj):
+    """Cache namespaces whose contents depend on this row"""
+    if isinstance(obj, SavedWord):
+        return (f"bank:{obj.user_id}", f"stats:{obj.user_id}")
+    if isinstance(obj, Achievement):
+        return (f"stats:{obj.user_id}",)
+    if isinstance(obj, User):
+        return (f"stats:{obj.id}",)
+    return ()
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_invalidations(session, flush_context):
+    pending = session.info.setdefault("cache_invalidate", set())
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        pending.update(namespaces_for(obj))
+
+
+# Invalidate only once the write is visible, so a concurrent reader cannot
+# re-cache the pre-commit state
+@event.listens_for(Session, "after_commit")
+def _apply_invalidations(session):
+    pending = session.info.pop("cache_invalidate", None)
+    if not pending or not has_app_context():
+        return
+    cache = current_app.config.get("CACHE")
+    if cache is not None:
+        cache.invalidate(*pending)
+
+
+@event.listens_for(Session, "after_rollback")
+def _drop_invalidations(session):
+    session.info.pop("cache_invalidate", None)
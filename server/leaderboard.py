@@ -0,0 +1,280 @@
+# leaderboard.py
+"""In-process streak and word-count leaderboards.
+
+Scores are kept in ranked skip lists (ordered by score, then user id) that are
+updated whenever a user's streak or word count changes, so top-N and
+"my rank" lookups are O(log n) instead of sorting the users table per request.
+Boards exist globally and per cohort, where a cohort is the signup month.
+
+Streaks that lapse without activity are expired by a once-a-day rollover pass
+over the users last active on the expired days, rather than by re-checking
+dates on every read.
+
+Each worker holds its own copy and only sees the updates it handles itself,
+so callers rebuild from the database once the copy is older than a refresh
+interval; between rebuilds, local updates keep it current. `begin_refresh`
+lets one caller per interval run the rebuild while the others keep serving
+the current board. Local updates made while that rebuild's query runs are
+replayed on top of its snapshot, so they are not lost to older data.
+"""
+import random
+import threading
+import time
+from datetime import date, timedelta
+
+METRICS = ("streak", "words")
+
+_MAX_LEVEL = 24
+
+
+class _Node:
+    __slots__ = ("key", "next", "width")
+
+    def __init__(self, key, level):
+        self.key = key
+        self.next = [None] * level
+        # width[i] = number of level-0 steps to next[i] (or to the end of the list)
+        self.width = [1] * level
+
+
+class RankedSet:
+    """Indexable skip list: insert, remove, rank and slice in O(log n)."""
+
+    def __init__(self):
+        self._head = _Node(None, _MAX_LEVEL)
+        self._size = 0
+
+    def __len__(self):
+        return self._size
+
+    def _search(self, key):
+        chain = [None] * _MAX_LEVEL
+        steps = [0] * _MAX_LEVEL
+        node, pos = self._head, 0
+        for lvl in reversed(range(_MAX_LEVEL)):
+            while node.next[lvl] is not None and node.next[lvl].key < key:
+                pos += node.width[lvl]
+                node = node.next[lvl]
+            chain[lvl] = node
+            steps[lvl] = pos
+        return chain, steps, pos
+
+    def add(self, key):
+        chain, steps, pos = self._search(key)
+        level = 1
+        while level < _MAX_LEVEL and random.random() < 0.5:
+            level += 1
+        new = _Node(key, level)
+        for lvl in range(level):
+            prev = chain[lvl]
+            skipped = pos - steps[lvl]
+            new.next[lvl] = prev.next[lvl]
+            prev.next[lvl] = new
+            new.width[lvl] = prev.width[lvl] - skipped
+            prev.width[lvl] = skipped + 1
+        for lvl in range(level, _MAX_LEVEL):
+            chain[lvl].width[lvl] += 1
+        self._size += 1
+
+    def discard(self, key):
+        chain, _, _ = self._search(key)
+        target = chain[0].next[0]
+        if target is None or target.key != key:
+            return
+        for lvl in range(len(target.next)):
+            prev = chain[lvl]
+            prev.width[lvl] += target.width[lvl] - 1
+            prev.next[lvl] = target.next[lvl]
+        for lvl in range(len(target.next), _MAX_LEVEL):
+            chain[lvl].width[lvl] -= 1
+        self._size -= 1
+
+    def index(self, key):
+        """0-based position of `key`, or None if absent."""
+        chain, _, pos = self._search(key)
+        target = chain[0].next[0]
+        if target is None or target.key != key:
+            return None
+        return pos
+
+    def slice(self, start, count):
+        node, remaining = self._head, start + 1
+        for lvl in reversed(range(_MAX_LEVEL)):
+            while node.next[lvl] is not None and node.width[lvl] <= remaining:
+                remaining -= node.width[lvl]
+                node = node.next[lvl]
+        if remaining:
+            return []
+        out = []
+        while node is not None and len(out) < count:
+            out.append(node.key)
+            node = node.next[0]
+        return out
+
+
+def cohort_for(created_at):
+    return created_at.strftime("%Y-%m") if created_at else None
+
+
+class Leaderboard:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._refreshing = False
+        self._replay = []  # local updates since begin_refresh(), as (method, args)
+        self._reset()
+
+    def _reset(self):
+        self._boards = {}       # (metric, cohort or None) -> RankedSet
+        self._scores = {}       # (metric, uid) -> score
+        self._cohorts = {}      # uid -> cohort
+        self._active_on = {}    # last activity date -> uids holding a live streak
+        self._last_active = {}  # uid -> last activity date
+        self._rolled_on = None
+        self._built_at = None
+
+    # ---- internal helpers (caller holds the lock) ----
+    def _board(self, metric, cohort):
+        board = self._boards.get((metric, cohort))
+        if board is None:
+            board = self._boards[(metric, cohort)] = RankedSet()
+        return board
+
+    def _set(self, metric, uid, score):
+        old = self._scores.get((metric, uid), 0)
+        if old == score:
+            return
+        cohort = self._cohorts.get(uid)
+        scopes = (None, cohort) if cohort else (None,)
+        for scope in scopes:
+            board = self._board(metric, scope)
+            if old > 0:
+                board.discard((-old, uid))
+            if score > 0:
+                board.add((-score, uid))
+        if score > 0:
+            self._scores[(metric, uid)] = score
+        else:
+            self._scores.pop((metric, uid), None)
+
+    def _touch(self, uid, last_activity):
+        prev = self._last_active.pop(uid, None)
+        if prev is not None:
+            bucket = self._active_on.get(prev)
+            if bucket is not None:
+                bucket.discard(uid)
+                if not bucket:
+                    del self._active_on[prev]
+        if last_activity is not None:
+            self._last_active[uid] = last_activity
+            self._active_on.setdefault(last_activity, set()).add(uid)
+
+    def _rollover(self, today):
+        cutoff = today - timedelta(days=1)
+        for day in [d for d in self._active_on if d < cutoff]:
+            for uid in self._active_on.pop(day):
+                self._last_active.pop(uid, None)
+                self._set("streak", uid, 0)
+        self._rolled_on = today
+
+    def _record_streak(self, uid, streak, last_activity, created_at=None, today=None):
+        self._maybe_rollover(today)
+        if created_at is not None:
+            self._cohorts.setdefault(uid, cohort_for(created_at))
+        self._touch(uid, last_activity)
+        self._set("streak", uid, streak or 0)
+
+    def _record_words(self, uid, count, created_at=None):
+        if created_at is not None:
+            self._cohorts.setdefault(uid, cohort_for(created_at))
+        self._set("words", uid, max(0, count or 0))
+
+    def _record(self, method, *args):
+        method(*args)
+        if self._refreshing:
+            self._replay.append((method, args))
+
+    # ---- public API ----
+    def begin_refresh(self, max_age):
+        """Claim a due rebuild: True for one caller until `end_refresh()`.
+
+        Call before reading the rows for `rebuild()`, so updates recorded from
+        here on are replayed over the snapshot.
+        """
+        with self._lock:
+            if self._refreshing or not self._is_stale(max_age):
+                return False
+            self._refreshing = True
+            self._replay = []
+            return True
+
+    def end_refresh(self):
+        with self._lock:
+            self._refreshing = False
+            self._replay = []
+
+    def rebuild(self, rows, today=None):
+        """Reset from (uid, created_at, current_streak, last_activity_date, word_count) rows."""
+        today = today or date.today()
+        with self._lock:
+            self._reset()
+            for uid, created_at, streak, last_activity, words in rows:
+                self._cohorts[uid] = cohort_for(created_at)
+                self._set("words", uid, words or 0)
+                if streak and last_activity is not None:
+                    self._touch(uid, last_activity)
+                    self._set("streak", uid, streak)
+            self._rollover(today)
+            # Updates are absolute values, so re-applying one the snapshot
+            # already includes is harmless
+            for method, args in self._replay:
+                method(*args)
+            self._replay = []
+            self._built_at = time.monotonic()
+
+    def _is_stale(self, max_age):
+        """True if never built or last rebuilt more than `max_age` seconds ago."""
+        return self._built_at is None or time.monotonic() - self._built_at > max_age
+
+    def record_streak(self, uid, streak, last_activity, created_at=None, today=None):
+        with self._lock:
+            self._record(self._record_streak, uid, streak, last_activity, created_at, today)
+
+    def record_words(self, uid, count, created_at=None):
+        with self._lock:
+            self._record(self._record_words, uid, count, created_at)
+
+    def _maybe_rollover(self, today):
+        today = today or date.today()
+        if self._rolled_on != today:
+            self._rollover(today)
+
+    def maybe_rollover(self, today=None):
+        """Expire lapsed streaks once per calendar day; a no-op otherwise."""
+        with self._lock:
+            self._maybe_rollover(today)
+
+    def cohort_of(self, uid):
+        return self._cohorts.get(uid)
+
+    def top(self, metric, limit=10, offset=0, cohort=None):
+        with self._lock:
+            board = self._boards.get((metric, cohort))
+            if board is None:
+                return []
+            keys = board.slice(offset, limit)
+        return [
+            {"rank": offset + i + 1, "userId": uid, "score": -neg}
+            for i, (neg, uid) in enumerate(keys)
+        ]
+
+    def rank_of(self, metric, uid, cohort=None):
+        """1-based rank and score for `uid`, or None if unranked."""
+        with self._lock:
+            score = self._scores.get((metric, uid))
+            board = self._boards.get((metric, cohort))
+            if not score or board is None:
+                return None
+            pos = board.index((-score, uid))
+            if pos is None:
+                return None
+            return {"rank": pos + 1, "score": score, "of": len(board)}
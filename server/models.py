@@ -114,6 +114,23 @@ class SavedWord(db.Model):
         }
 
 
+# Column-only read path. Same keys as SavedWord.to_dict(), but selected as
+# plain tuples so large banks skip ORM hydration; datetimes stay native and
+# are formatted by serialization.fast_jsonify.
+SAVED_WORD_FIELDS = (
+    ("id", SavedWord.id),
+    ("english", SavedWord.english),
+    ("tamil", SavedWord.tamil),
+    ("transliteration", SavedWord.transliteration),
+    ("reviewCount", SavedWord.review_count),
+    ("correctCount", SavedWord.correct_count),
+    ("lastReviewed", SavedWord.last_reviewed),
+    ("nextReview", SavedWord.next_review),
+    ("difficulty", SavedWord.difficulty),
+    ("createdAt", SavedWord.created_at),
+)
+
+
 class Achievement(db.Model):
     __tablename__ = "achievements"
 
@@ -132,4 +149,51 @@ class Achievement(db.Model):
             "id": self.id,
             "type": self.achievement_type,
             "unlockedAt": self.unlocked_at.isoformat() + "Z"
-        }
\ No newline at end of file
+        }
+
+
+class SavedWordTerm(db.Model):
+    """Portable search index (see search.py): one row per distinct term of a saved word"""
+    __tablename__ = "saved_word_terms"
+
+    word_id = db.Column(
+        db.Integer, db.ForeignKey("saved_words.id", ondelete="CASCADE"), primary_key=True
+    )
+    term = db.Column(db.String(128), primary_key=True)
+    user_id = db.Column(db.Integer, nullable=False)
+    weight = db.Column(db.Integer, default=1, nullable=False)
+
+    __table_args__ = (
+        db.Index("ix_saved_word_terms_user_term", "user_id", "term"),
+    )
+
+
+class SavedWordGram(db.Model):
+    """Portable substring index (see search.py): trigrams of a saved word's terms"""
+    __tablename__ = "saved_word_grams"
+
+    word_id = db.Column(
+        db.Integer, db.ForeignKey("saved_words.id", ondelete="CASCADE"), primary_key=True
+    )
+    gram = db.Column(db.String(16), primary_key=True)
+    user_id = db.Column(db.Integer, nullable=False)
+
+    __table_args__ = (
+        db.Index("ix_saved_word_grams_user_gram", "user_id", "gram"),
+    )
+
+
+ACHIEVEMENT_FIELDS = (
+    ("id", Achievement.id),
+    ("type", Achievement.achievement_type),
+    ("unlockedAt", Achievement.unlocked_at),
+)
+
+
+def select_fields(fields):
+    return db.select(*(col for _, col in fields))
+
+
+def rows_to_dicts(fields, rows):
+    keys = [k for k, _ in fields]
+    return [dict(zip(keys, r)) for r in rows]
@@ -0,0 +1,292 @@
+# ratelimit.py
+"""Token-bucket quotas and a concurrency cap for the model-backed endpoints.
+
+Each client (user id when a valid JWT is present, otherwise remote IP) gets a
+token bucket per scope, e.g. "identify" or "translate". Separately, at most
+`concurrency` model calls may be in flight at once; requests over either
+limit get a 429 with a Retry-After header instead of queueing behind
+everyone else.
+
+Bucket and in-flight state lives in process by default. Pointing
+RATE_LIMIT_STORE at a SQLite file shares it between workers on one host.
+Behind a reverse proxy, set TRUSTED_PROXIES to the number of proxy hops so
+anonymous clients are keyed by their X-Forwarded-For address.
+"""
+import math
+import re
+import sqlite3
+import threading
+import time
+import uuid
+from functools import wraps
+
+from flask import jsonify, request
+from flask_jwt_extended import get_jwt_identity, verify_jwt_in_request
+
+_PERIODS = {"second": 1, "minute": 60, "hour": 3600, "day": 86400}
+_RATE_RE = re.compile(r"^\s*(\d+)\s*/\s*(\d*)\s*(second|minute|hour|day)s?\s*$")
+
+
+def parse_rate(value):
+    """'10/minute' or '100/5minutes' -> (capacity, refill per second)"""
+    m = _RATE_RE.match(value or "")
+    if not m:
+        raise ValueError(f"Invalid rate: {value!r} (expected e.g. '10/minute')")
+    count, mult, unit = int(m.group(1)), int(m.group(2) or 1), m.group(3)
+    if count < 1 or mult < 1:
+        raise ValueError(f"Invalid rate: {value!r} (count and period must be at least 1)")
+    return count, count / (mult * _PERIODS[unit])
+
+
+class MemoryStore:
+    """Per-process bucket and lease state."""
+
+    SWEEP_EVERY = 1000
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._buckets = {}  # key -> (tokens, updated, time the bucket is full again)
+        self._leases = {}   # lease id -> expires
+        self._ops = 0
+
+    def take(self, key, capacity, rate, now=None):
+        """Spend one token; return (allowed, tokens left, seconds until next token)"""
+        now = now or time.time()
+        with self._lock:
+            tokens, updated, _ = self._buckets.get(key, (capacity, now, now))
+            tokens = min(capacity, tokens + (now - updated) * rate)
+            allowed = tokens >= 1
+            if allowed:
+                tokens -= 1
+            self._buckets[key] = (tokens, now, now + (capacity - tokens) / rate)
+            self._ops += 1
+            if self._ops % self.SWEEP_EVERY == 0:
+                self._sweep(now)
+        return allowed, tokens, 0 if allowed else (1 - tokens) / rate
+
+    def _sweep(self, now):
+        # A bucket that has refilled is the same as no bucket at all
+        for key in [k for k, (_, _, full_at) in self._buckets.items() if full_at <= now]:
+            del self._buckets[key]
+
+    def acquire(self, limit, lease_seconds, now=None):
+        now = now or time.time()
+        with self._lock:
+            for lid in [l for l, exp in self._leases.items() if exp <= now]:
+                del self._leases[lid]
+            if len(self._leases) >= limit:
+                return None
+            lid = uuid.uuid4().hex
+            self._leases[lid] = now + lease_seconds
+            return lid
+
+    def release(self, lease_id):
+        with self._lock:
+            self._leases.pop(lease_id, None)
+
+    def in_flight(self):
+        with self._lock:
+            return len(self._leases)
+
+    def tracked(self):
+        with self._lock:
+            return len(self._buckets)
+
+
+class SQLiteStore:
+    """Bucket and lease state in a SQLite file shared by all workers on a host."""
+
+    SWEEP_EVERY = 1000
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        self._ops = 0
+        with self._conn() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS rl_buckets "
+                "(key TEXT PRIMARY KEY, tokens REAL NOT NULL, updated REAL NOT NULL, "
+                "full_at REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS ix_rl_buckets_full_at ON rl_buckets (full_at)")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS rl_leases "
+                "(id TEXT PRIMARY KEY, expires REAL NOT NULL)"
+            )
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return _Txn(conn)
+
+    def take(self, key, capacity, rate, now=None):
+        now = now or time.time()
+        with self._conn() as conn:
+            row = conn.execute(
+                "SELECT tokens, updated FROM rl_buckets WHERE key = ?", (key,)
+            ).fetchone()
+            tokens, updated = row if row else (capacity, now)
+            tokens = min(capacity, tokens + (now - updated) * rate)
+            allowed = tokens >= 1
+            if allowed:
+                tokens -= 1
+            conn.execute(
+                "INSERT OR REPLACE INTO rl_buckets (key, tokens, updated, full_at) "
+                "VALUES (?, ?, ?, ?)",
+                (key, tokens, now, now + (capacity - tokens) / rate),
+            )
+            self._ops += 1
+            if self._ops % self.SWEEP_EVERY == 0:
+                conn.execute("DELETE FROM rl_buckets WHERE full_at <= ?", (now,))
+        return allowed, tokens, 0 if allowed else (1 - tokens) / rate
+
+    def acquire(self, limit, lease_seconds, now=None):
+        now = now or time.time()
+        with self._conn() as conn:
+            conn.execute("DELETE FROM rl_leases WHERE expires <= ?", (now,))
+            (count,) = conn.execute("SELECT count(*) FROM rl_leases").fetchone()
+            if count >= limit:
+                return None
+            lid = uuid.uuid4().hex
+            conn.execute("INSERT INTO rl_leases (id, expires) VALUES (?, ?)",
+                         (lid, now + lease_seconds))
+            return lid
+
+    def release(self, lease_id):
+        with self._conn() as conn:
+            conn.execute("DELETE FROM rl_leases WHERE id = ?", (lease_id,))
+
+    def in_flight(self):
+        with self._conn() as conn:
+            return conn.execute(
+                "SELECT count(*) FROM rl_leases WHERE expires > ?", (time.time(),)
+            ).fetchone()[0]
+
+    def tracked(self):
+        with self._conn() as conn:
+            return conn.execute("SELECT count(*) FROM rl_buckets").fetchone()[0]
+
+
+class _Txn:
+    """BEGIN IMMEDIATE ... COMMIT so read-modify-write is atomic across processes."""
+
+    def __init__(self, conn):
+        self.conn = conn
+
+    def __enter__(self):
+        self.conn.execute("BEGIN IMMEDIATE")
+        return self.conn
+
+    def __exit__(self, exc_type, exc, tb):
+        self.conn.execute("ROLLBACK" if exc_type else "COMMIT")
+
+
+def make_store(url):
+    if not url or url == "memory":
+        return MemoryStore()
+    if url.startswith("sqlite:///"):
+        return SQLiteStore(url[len("sqlite:///"):])
+    raise ValueError(f"Unsupported RATE_LIMIT_STORE: {url!r}")
+
+
+def too_many_requests(retry_after, message="Too many requests"):
+    retry_after = max(1, math.ceil(retry_after))
+    resp = jsonify({"message": message, "retryAfter": retry_after})
+    resp.headers["Retry-After"] = str(retry_after)
+    return resp, 429
+
+
+class RateLimiter:
+    def __init__(self, store, rates, concurrency, lease_seconds=60):
+        self.store = store
+        self.rates = {scope: parse_rate(r) for scope, r in rates.items()}
+        self.concurrency = concurrency
+        self.lease_seconds = lease_seconds
+        self._lock = threading.Lock()
+        self._stats = {
+            scope: {"allowed": 0, "limited": 0, "busy": 0, "cached": 0} for scope in self.rates
+        }
+
+    def _count(self, scope, field):
+        with self._lock:
+            self._stats[scope][field] += 1
+
+    @staticmethod
+    def client_key():
+        try:
+            verify_jwt_in_request(optional=True)
+            uid = get_jwt_identity()
+        except Exception:
+            uid = None
+        return f"user:{uid}" if uid else f"ip:{request.remote_addr}"
+
+    def limit(self, scope, cached=None):
+        """Apply the `scope` bucket and the global model concurrency cap to a view.
+
+        `cached`, if given, is called first; a non-None result (e.g. a cached
+        response) is returned as is, without spending a token or a lease.
+        """
+        capacity, rate = self.rates[scope]
+
+        def decorator(view):
+            @wraps(view)
+            def wrapped(*args, **kwargs):
+                if cached is not None:
+                    resp = cached()
+                    if resp is not None:
+                        self._count(scope, "cached")
+                        return resp
+
+                try:
+                    allowed, _, wait = self.store.take(
+                        f"{scope}:{self.client_key()}", capacity, rate
+                    )
+                except sqlite3.Error as e:
+                    print("[RateLimit] store error, allowing request:", e)
+                    allowed, wait = True, 0
+                if not allowed:
+                    self._count(scope, "limited")
+                    return too_many_requests(wait)
+
+                try:
+                    lease = self.store.acquire(self.concurrency, self.lease_seconds)
+                except sqlite3.Error as e:
+                    print("[RateLimit] store error, allowing request:", e)
+                    lease = ""
+                if lease is None:
+                    self._count(scope, "busy")
+                    return too_many_requests(1, "Server busy, retry shortly")
+
+                self._count(scope, "allowed")
+                try:
+                    return view(*args, **kwargs)
+                finally:
+                    if lease:
+                        try:
+                            self.store.release(lease)
+                        except sqlite3.Error as e:
+                            print("[RateLimit] lease release failed:", e)
+            return wrapped
+        return decorator
+
+    def stats(self):
+        with self._lock:
+            scopes = {s: dict(v) for s, v in self._stats.items()}
+        try:
+            in_flight, tracked = self.store.in_flight(), self.store.tracked()
+        except sqlite3.Error:
+            in_flight, tracked = -1, -1
+        return {
+            "store": type(self.store).__name__,
+            "concurrencyLimit": self.concurrency,
+            "inFlight": in_flight,
+            "trackedBuckets": tracked,
+            "rates": {
+                s: {"burst": cap, "perSecond": round(rate, 6)}
+                for s, (cap, rate) in self.rates.items()
+            },
+            "scopes": scopes,
+        }
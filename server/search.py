@@ -0,0 +1,301 @@
+# search.py
+"""Server-side search over a user's saved words.
+
+Words are indexed by their English, Tamil and transliteration terms. Text is
+normalized before it reaches either index: Tamil is NFC-composed with joiners
+removed, everything else is case- and diacritic-folded, so "palam", "PALAM"
+and "paḻam" all find பழம். Transliterations are indexed both as stored and
+as produced by the local transliteration engine.
+
+Queries whose terms are all at least three characters long match anywhere
+inside a term ("fruit" finds "jackfruit", பழம finds பலாப்பழம்) through a
+trigram index; shorter queries match term prefixes.
+
+On SQLite with FTS5 both indexes are virtual tables: `saved_words_fts`
+(prefix indexes) and `saved_words_trigram` (trigram tokenizer). Elsewhere,
+`saved_word_terms` (one row per term, indexed on user_id + term) answers
+prefix queries as index range scans, and `saved_word_grams` narrows substring
+queries to the words containing every trigram before the terms are checked.
+Either way a query touches only matching entries, not the whole bank.
+"""
+import re
+import unicodedata
+
+from flask import current_app, has_app_context
+from sqlalchemy import case, event, func, inspect, literal, text, union_all
+from sqlalchemy.exc import OperationalError
+
+from models import db, SavedWord, SavedWordTerm, SavedWordGram
+from transliterate import transliterate
+
+MAX_QUERY_TERMS = 8
+TRIGRAM_MIN = 3
+
+_JOINERS = dict.fromkeys(map(ord, "\u200c\u200d"))
+_TAMIL_RUN_RE = re.compile(r"([\u0b80-\u0bff]+)")
+_TERM_RE = re.compile(r"[\u0b80-\u0bff]+|[^\W_\u0b80-\u0bff]+")
+
+# Field weights for ranking, in index column order
+FIELDS = ("english", "tamil", "transliteration")
+WEIGHTS = {"english": 3, "tamil": 3, "transliteration": 2}
+
+
+def _fold(s):
+    s = unicodedata.normalize("NFKD", s)
+    return "".join(ch for ch in s if not unicodedata.combining(ch)).casefold()
+
+
+def normalize(s) -> str:
+    """Tamil runs NFC-composed, all other text case- and diacritic-folded."""
+    if not s:
+        return ""
+    s = unicodedata.normalize("NFC", s).translate(_JOINERS)
+    parts = _TAMIL_RUN_RE.split(s)
+    # split() with a capture group alternates non-Tamil / Tamil runs
+    return "".join(p if i % 2 else _fold(p) for i, p in enumerate(parts))
+
+
+def terms(s):
+    return _TERM_RE.findall(normalize(s))
+
+
+def trigrams(term):
+    return {term[i:i + TRIGRAM_MIN] for i in range(len(term) - TRIGRAM_MIN + 1)}
+
+
+def document(english, tamil, translit):
+    """field -> distinct terms for one saved word"""
+    translit_terms = terms(translit) + terms(transliterate(tamil or ""))
+    return {
+        "english": list(dict.fromkeys(terms(english))),
+        "tamil": list(dict.fromkeys(terms(tamil))),
+        "transliteration": list(dict.fromkeys(translit_terms)),
+    }
+
+
+class SearchIndex:
+    FTS_TABLE = "saved_words_fts"
+    TRIGRAM_TABLE = "saved_words_trigram"
+
+    def __init__(self, app=None):
+        self.use_fts = False
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config["SEARCH_INDEX"] = self
+        with app.app_context():
+            engine = db.engine
+            if engine.dialect.name == "sqlite":
+                try:
+                    with engine.begin() as conn:
+                        conn.execute(text(
+                            f"CREATE VIRTUAL TABLE IF NOT EXISTS {self.FTS_TABLE} USING fts5("
+                            "owner, english, tamil, transliteration, "
+                            "tokenize='ascii', prefix='1 2 3')"
+                        ))
+                        conn.execute(text(
+                            f"CREATE VIRTUAL TABLE IF NOT EXISTS {self.TRIGRAM_TABLE} USING fts5("
+                            "owner, english, tamil, transliteration, tokenize='trigram')"
+                        ))
+                    self.use_fts = True
+                except OperationalError as e:
+                    print("[Search] FTS5 trigram index unavailable, using term tables:", e)
+            print(f"[Search] Using {'FTS5' if self.use_fts else 'term table'} index")
+            if self._needs_rebuild():
+                with engine.begin() as conn:
+                    self.reindex(conn)
+
+    @staticmethod
+    def _owner(user_id):
+        # Fixed width, because trigram phrases match substrings: u0000000001 is
+        # not contained in u0000000011
+        return f"u{int(user_id):010d}"
+
+    # ---- maintenance ----
+    def _needs_rebuild(self):
+        with db.engine.connect() as conn:
+            words = conn.execute(db.select(func.count(SavedWord.id))).scalar()
+            if self.use_fts:
+                return any(
+                    conn.execute(text(f"SELECT count(*) FROM {table}")).scalar() != words
+                    for table in (self.FTS_TABLE, self.TRIGRAM_TABLE)
+                )
+            indexed = conn.execute(
+                db.select(func.count(func.distinct(SavedWordTerm.word_id)))
+            ).scalar()
+            grams = conn.execute(db.select(func.count()).select_from(SavedWordGram)).scalar()
+        return words != indexed or (words > 0 and grams == 0)
+
+    def remove(self, conn, word_ids):
+        if not word_ids:
+            return
+        if self.use_fts:
+            for table in (self.FTS_TABLE, self.TRIGRAM_TABLE):
+                conn.execute(
+                    text(f"DELETE FROM {table} WHERE rowid = :id"),
+                    [{"id": i} for i in word_ids],
+                )
+        else:
+            for model in (SavedWordTerm, SavedWordGram):
+                conn.execute(model.__table__.delete().where(model.word_id.in_(word_ids)))
+
+    def add(self, conn, rows):
+        """Index (id, user_id, english, tamil, transliteration) rows"""
+        if not rows:
+            return
+        if self.use_fts:
+            params, tri_params = [], []
+            for wid, uid, english, tamil, translit in rows:
+                fields = {f: " ".join(v) for f, v in document(english, tamil, translit).items()}
+                params.append({"id": wid, "owner": f"u{uid}", **fields})
+                tri_params.append({"id": wid, "owner": self._owner(uid), **fields})
+            for table, p in ((self.FTS_TABLE, params), (self.TRIGRAM_TABLE, tri_params)):
+                conn.execute(text(
+                    f"INSERT INTO {table}(rowid, owner, english, tamil, transliteration) "
+                    "VALUES (:id, :owner, :english, :tamil, :transliteration)"
+                ), p)
+        else:
+            params, gram_params = [], []
+            for wid, uid, english, tamil, translit in rows:
+                weights = {}
+                for f, fterms in document(english, tamil, translit).items():
+                    for t in fterms:
+                        weights[t] = max(weights.get(t, 0), WEIGHTS[f])
+                params.extend(
+                    {"word_id": wid, "user_id": uid, "term": t[:128], "weight": w}
+                    for t, w in weights.items()
+                )
+                grams = set().union(*(trigrams(t) for t in weights))
+                gram_params.extend({"word_id": wid, "user_id": uid, "gram": g} for g in grams)
+            if params:
+                conn.execute(SavedWordTerm.__table__.insert(), params)
+            if gram_params:
+                conn.execute(SavedWordGram.__table__.insert(), gram_params)
+
+    def reindex(self, conn, word_ids=None):
+        """Rebuild index entries for `word_ids`, or the whole index when None."""
+        q = db.select(SavedWord.id, SavedWord.user_id, SavedWord.english,
+                      SavedWord.tamil, SavedWord.transliteration)
+        if word_ids is None:
+            if self.use_fts:
+                for table in (self.FTS_TABLE, self.TRIGRAM_TABLE):
+                    conn.execute(text(f"DELETE FROM {table}"))
+            else:
+                conn.execute(SavedWordTerm.__table__.delete())
+                conn.execute(SavedWordGram.__table__.delete())
+        else:
+            word_ids = list(word_ids)
+            self.remove(conn, word_ids)
+            q = q.where(SavedWord.id.in_(word_ids))
+        self.add(conn, conn.execute(q).all())
+
+    # ---- queries ----
+    def search(self, user_id, query, limit=20, offset=0):
+        """Return (word ids in rank order, total matches)"""
+        qterms = list(dict.fromkeys(terms(query)))[:MAX_QUERY_TERMS]
+        if not qterms:
+            return [], 0
+        substring = all(len(t) >= TRIGRAM_MIN for t in qterms)
+        if self.use_fts:
+            # Terms are pre-tokenized, so quoting them is always safe
+            if substring:
+                table, owner = self.TRIGRAM_TABLE, self._owner(user_id)
+                body = " AND ".join('"%s"' % t for t in qterms)
+            else:
+                table, owner = self.FTS_TABLE, f"u{int(user_id)}"
+                body = " AND ".join('"%s"*' % t for t in qterms)
+            match = f'owner : "{owner}" AND {{english tamil transliteration}} : ({body})'
+            return self._search_fts(table, match, limit, offset)
+        return self._search_terms(user_id, qterms, substring, limit, offset)
+
+    def _search_fts(self, table, match, limit, offset):
+        weights = ", ".join(str(WEIGHTS[f]) for f in FIELDS)
+        total = db.session.execute(
+            text(f"SELECT count(*) FROM {table} WHERE {table} MATCH :m"), {"m": match},
+        ).scalar()
+        ids = db.session.execute(text(
+            f"SELECT rowid FROM {table} WHERE {table} MATCH :m "
+            f"ORDER BY bm25({table}, 0, {weights}), rowid DESC "
+            "LIMIT :limit OFFSET :offset"
+        ), {"m": match, "limit": limit, "offset": offset}).scalars().all()
+        return ids, total
+
+    def _search_terms(self, user_id, qterms, substring, limit, offset):
+        T, G = SavedWordTerm, SavedWordGram
+        if substring:
+            # Only words containing every query trigram can contain every query term
+            grams = sorted(set().union(*(trigrams(t) for t in qterms)))
+            candidates = (
+                db.select(G.word_id)
+                .where(G.user_id == user_id, G.gram.in_(grams))
+                .group_by(G.word_id)
+                .having(func.count(func.distinct(G.gram)) == len(grams))
+            )
+            conditions = [
+                (T.word_id.in_(candidates), T.term.contains(t, autoescape=True))
+                for t in qterms
+            ]
+        else:
+            conditions = [(T.term >= t, T.term < t + "\uffff") for t in qterms]
+
+        per_term = [
+            db.select(
+                T.word_id,
+                literal(i).label("qi"),
+                (T.weight * case(
+                    (T.term == t, 3), (T.term.startswith(t, autoescape=True), 2), else_=1
+                )).label("score"),
+            ).where(T.user_id == user_id, *cond)
+            for i, (t, cond) in enumerate(zip(qterms, conditions))
+        ]
+        hits = union_all(*per_term).subquery()
+        matched = (
+            db.select(hits.c.word_id, func.sum(hits.c.score).label("score"))
+            .group_by(hits.c.word_id)
+            .having(func.count(func.distinct(hits.c.qi)) == len(qterms))
+            .subquery()
+        )
+        total = db.session.execute(db.select(func.count()).select_from(matched)).scalar()
+        ids = db.session.execute(
+            db.select(matched.c.word_id)
+            .order_by(matched.c.score.desc(), matched.c.word_id.desc())
+            .limit(limit).offset(offset)
+        ).scalars().all()
+        return ids, total
+
+
+# ---- keep the index in step with SavedWord writes ----
+def _active_index():
+    if has_app_context():
+        return current_app.config.get("SEARCH_INDEX")
+    return None
+
+
+def _row(target):
+    return (target.id, target.user_id, target.english, target.tamil, target.transliteration)
+
+
+@event.listens_for(SavedWord, "after_insert")
+def _index_insert(mapper, connection, target):
+    index = _active_index()
+    if index is not None:
+        index.add(connection, [_row(target)])
+
+
+@event.listens_for(SavedWord, "after_update")
+def _index_update(mapper, connection, target):
+    index = _active_index()
+    if index is None:
+        return
+    state = inspect(target)
+    if any(state.attrs[f].history.has_changes() for f in FIELDS):
+        index.remove(connection, [target.id])
+        index.add(connection, [_row(target)])
+
+
+@event.listens_for(SavedWord, "after_delete")
+def _index_delete(mapper, connection, target):
+    index = _active_index()
+    if index is not None:
+        index.remove(connection, [target.id])
@@ -0,0 +1,78 @@
+# serialization.py
+"""Fast JSON responses for the read-heavy endpoints.
+
+`fast_jsonify` produces the same bytes as `flask.jsonify` for the payloads the
+API returns, but encodes with orjson when it is installed and formats
+datetimes natively, so rows can be passed straight from a column-only query
+without per-row `isoformat()` calls. Naive datetimes are UTC and get a "Z"
+suffix, matching the models' `to_dict()` output.
+"""
+import json
+import re
+from datetime import datetime, date
+
+from flask import current_app
+
+try:
+    import orjson
+except ImportError:  # optional speedup; stdlib json is used otherwise
+    orjson = None
+
+_NON_ASCII_RE = re.compile("[\x7f-\U0010ffff]")
+
+
+def _escape(m):
+    n = ord(m.group(0))
+    if n < 0x10000:
+        return "\\u%04x" % n
+    n -= 0x10000
+    return "\\u%04x\\u%04x" % (0xD800 | (n >> 10), 0xDC00 | (n & 0x3FF))
+
+
+def _default(o):
+    if isinstance(o, datetime):
+        return o.isoformat() + "Z"
+    if isinstance(o, date):
+        return o.isoformat()
+    raise TypeError(f"Object of type {type(o).__name__} is not JSON serializable")
+
+
+def dumps(obj, sort_keys=True, ensure_ascii=True, indent=False) -> str:
+    if orjson is not None:
+        option = orjson.OPT_NAIVE_UTC | orjson.OPT_UTC_Z
+        if sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        out = orjson.dumps(obj, option=option)
+        if out.isascii():
+            return out.decode("ascii")
+        out = out.decode("utf-8")
+        # orjson always emits UTF-8; escape like the stdlib's ensure_ascii does
+        return _NON_ASCII_RE.sub(_escape, out) if ensure_ascii else out
+
+    kwargs = {"indent": 2} if indent else {"separators": (",", ":")}
+    return json.dumps(obj, default=_default, sort_keys=sort_keys,
+                      ensure_ascii=ensure_ascii, **kwargs)
+
+
+def render_json(obj) -> bytes:
+    """Response body `jsonify(obj)` would produce, as bytes (e.g. for caching)."""
+    provider = current_app.json
+    indent = (provider.compact is None and current_app.debug) or provider.compact is False
+    body = dumps(
+        obj,
+        sort_keys=getattr(provider, "sort_keys", True),
+        ensure_ascii=getattr(provider, "ensure_ascii", True),
+        indent=indent,
+    )
+    return (body + "\n").encode("utf-8")
+
+
+def json_response(body: bytes):
+    return current_app.response_class(body, mimetype=current_app.json.mimetype)
+
+
+def fast_jsonify(obj):
+    """Drop-in for `jsonify(obj)` honouring the app's JSON provider settings."""
+    return json_response(render_json(obj))
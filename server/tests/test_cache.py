@@ -0,0 +1,170 @@
+import socketserver
+import threading
+
+import pytest
+
+from cache import Cache, MemoryBackend, RedisBackend, RespError
+
+
+class FakeRedis(socketserver.ThreadingTCPServer):
+    """Just enough of a RESP2 server: GET/SET/DEL/AUTH/SELECT."""
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, password=None):
+        super().__init__(("127.0.0.1", 0), _Handler)
+        self.password = password
+        self.data = {}
+        self.commands = []
+        self.connections = 0
+        self.drop_next = False
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    def _args(self):
+        line = self.rfile.readline()
+        if not line:
+            return None
+        args = []
+        for _ in range(int(line[1:-2])):
+            size = int(self.rfile.readline()[1:-2])
+            args.append(self.rfile.read(size + 2)[:-2])
+        return args
+
+    def handle(self):
+        server = self.server
+        server.connections += 1
+        authed = server.password is None
+        while True:
+            args = self._args()
+            if args is None:
+                return
+            server.commands.append(args)
+            if server.drop_next:
+                server.drop_next = False
+                return
+            cmd = args[0].upper()
+            if cmd == b"AUTH":
+                authed = args[1].decode() == server.password
+                self.wfile.write(b"+OK\r\n" if authed else b"-WRONGPASS invalid password\r\n")
+            elif not authed:
+                self.wfile.write(b"-NOAUTH Authentication required.\r\n")
+            elif cmd == b"SELECT":
+                self.wfile.write(b"+OK\r\n")
+            elif cmd == b"GET":
+                value = server.data.get(args[1])
+                self.wfile.write(
+                    b"$-1\r\n" if value is None else b"$%d\r\n%s\r\n" % (len(value), value)
+                )
+            elif cmd == b"SET":
+                server.data[args[1]] = args[2]
+                self.wfile.write(b"+OK\r\n")
+            elif cmd == b"DEL":
+                self.wfile.write(b":%d\r\n" % (server.data.pop(args[1], None) is not None))
+            else:
+                self.wfile.write(b"-ERR unknown command\r\n")
+
+
+@pytest.fixture
+def redis_server(request):
+    server = FakeRedis(**getattr(request, "param", {}))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def _url(server, auth=""):
+    host, port = server.server_address
+    return f"redis://{auth}{host}:{port}/2"
+
+
+def test_round_trip(redis_server):
+    backend = RedisBackend.from_url(_url(redis_server))
+    assert backend.get("k") is None
+    backend.set("k", b"\x00binary\r\nvalue", ttl=1.5)
+    assert backend.get("k") == b"\x00binary\r\nvalue"
+    backend.delete("k")
+    assert backend.get("k") is None
+
+    assert redis_server.commands[0] == [b"SELECT", b"2"]
+    assert [b"SET", b"k", b"\x00binary\r\nvalue", b"PX", b"1500"] in redis_server.commands
+    assert redis_server.connections == 1
+
+
+@pytest.mark.parametrize("redis_server", [{"password": "secret"}], indirect=True)
+def test_failed_auth_does_not_keep_connection(redis_server):
+    backend = RedisBackend.from_url(_url(redis_server, ":wrong@"))
+    for _ in range(2):
+        with pytest.raises(RespError, match="WRONGPASS"):
+            backend.get("k")
+        assert getattr(backend._local, "sock", None) is None
+    # Each attempt re-authenticates on a fresh connection; no GET was ever sent
+    assert redis_server.connections == 2
+    assert [c[0] for c in redis_server.commands] == [b"AUTH", b"AUTH"]
+
+
+@pytest.mark.parametrize("redis_server", [{"password": "secret"}], indirect=True)
+def test_auth_and_select(redis_server):
+    backend = RedisBackend.from_url(_url(redis_server, ":secret@"))
+    backend.set("k", b"v")
+    assert backend.get("k") == b"v"
+    assert redis_server.commands[:2] == [[b"AUTH", b"secret"], [b"SELECT", b"2"]]
+
+
+def test_reconnects_after_dropped_connection(redis_server):
+    backend = RedisBackend.from_url(_url(redis_server))
+    backend.set("k", b"v")
+    redis_server.drop_next = True
+    with pytest.raises(ConnectionError):
+        backend.get("k")
+    assert getattr(backend._local, "sock", None) is None
+    assert backend.get("k") == b"v"
+    assert redis_server.connections == 2
+
+
+def test_get_or_set_caches_result():
+    cache = Cache(MemoryBackend())
+    calls = []
+
+    def compute():
+        calls.append(1)
+        return b"body"
+
+    assert cache.get_or_set("bank:1", "list", compute) == b"body"
+    assert cache.get_or_set("bank:1", "list", compute) == b"body"
+    assert len(calls) == 1
+
+
+def test_get_or_set_does_not_cache_none():
+    cache = Cache(MemoryBackend())
+    assert cache.get_or_set("stats:1", "summary", lambda: None) is None
+    assert cache.get("stats:1", "summary") is None
+
+
+def test_invalidation_during_compute_orphans_the_result():
+    cache = Cache(MemoryBackend())
+
+    def compute():
+        # A write commits and invalidates while the stale body is being built
+        cache.invalidate("bank:1")
+        return b"stale"
+
+    assert cache.get_or_set("bank:1", "list", compute) == b"stale"
+    assert cache.get("bank:1", "list") is None
+    assert cache.get_or_set("bank:1", "list", lambda: b"fresh") == b"fresh"
+
+
+def test_shared_only_bypasses_per_process_backend():
+    cache = Cache(MemoryBackend())
+    calls = []
+
+    def compute():
+        calls.append(1)
+        return b"body"
+
+    for _ in range(2):
+        assert cache.get_or_set("bank:1", "list", compute, shared_only=True) == b"body"
+    assert len(calls) == 2
+    assert cache.stats()["sets"] == 0
@@ -0,0 +1,50 @@
+import threading
+from datetime import date, datetime
+
+from leaderboard import Leaderboard
+
+TODAY = date(2026, 3, 10)
+JOINED = datetime(2026, 1, 5)
+
+
+def test_one_refresh_claim_per_interval():
+    board = Leaderboard()
+    board.rebuild([], TODAY)
+    assert not board.begin_refresh(60)
+
+    results = []
+    start = threading.Barrier(8)
+
+    def claim():
+        start.wait()
+        results.append(board.begin_refresh(0))
+
+    threads = [threading.Thread(target=claim) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert results.count(True) == 1
+
+    board.end_refresh()
+    assert board.begin_refresh(0)
+
+
+def test_updates_during_refresh_survive_older_snapshot():
+    board = Leaderboard()
+    board.rebuild([(1, JOINED, 2, TODAY, 5), (2, JOINED, 1, TODAY, 3)], TODAY)
+
+    assert board.begin_refresh(0)
+    snapshot = [(1, JOINED, 2, TODAY, 5), (2, JOINED, 1, TODAY, 3)]
+    # Recorded after the snapshot was read, before it is applied
+    board.record_words(2, 9)
+    board.record_streak(2, 4, TODAY, today=TODAY)
+    board.rebuild(snapshot, TODAY)
+    board.end_refresh()
+
+    assert board.top("words", 1) == [{"rank": 1, "userId": 2, "score": 9}]
+    assert board.rank_of("streak", 2)["score"] == 4
+
+    # Once the refresh is over, later rebuilds no longer replay it
+    board.rebuild(snapshot, TODAY)
+    assert board.rank_of("words", 2)["score"] == 3
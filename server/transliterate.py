@@ -0,0 +1,96 @@
+# transliterate.py
+"""Rule-based Tamil script -> ISO 15919 transliteration.
+
+Tamil orthography is regular enough that transliteration is a pure table
+lookup: every consonant carries an inherent 'a' which is replaced by a
+following vowel sign or removed by the virama (pulli). The full table of
+consonant + sign clusters is expanded once at import time and matched with a
+single longest-first regex, so a word costs one `re.sub` pass.
+"""
+import re
+import unicodedata
+from functools import lru_cache
+
+VIRAMA = "்"
+
+VOWELS = {
+    "அ": "a", "ஆ": "ā", "இ": "i", "ஈ": "ī", "உ": "u", "ஊ": "ū",
+    "எ": "e", "ஏ": "ē", "ஐ": "ai", "ஒ": "o", "ஓ": "ō", "ஔ": "au",
+}
+
+CONSONANTS = {
+    "க": "k", "ங": "ṅ", "ச": "c", "ஞ": "ñ", "ட": "ṭ", "ண": "ṇ",
+    "த": "t", "ந": "n", "ப": "p", "ம": "m", "ய": "y", "ர": "r",
+    "ல": "l", "வ": "v", "ழ": "ḻ", "ள": "ḷ", "ற": "ṟ", "ன": "ṉ",
+    # Grantha letters used for loanwords
+    "ஜ": "j", "ஶ": "ś", "ஷ": "ṣ", "ஸ": "s", "ஹ": "h",
+}
+
+VOWEL_SIGNS = {
+    "ா": "ā", "ி": "i", "ீ": "ī", "ு": "u", "ூ": "ū",
+    "ெ": "e", "ே": "ē", "ை": "ai", "ொ": "o", "ோ": "ō", "ௌ": "au",
+}
+
+OTHER = {
+    "ஃ": "ḵ", "ௐ": "ōm",
+    "௦": "0", "௧": "1", "௨": "2", "௩": "3", "௪": "4",
+    "௫": "5", "௬": "6", "௭": "7", "௮": "8", "௯": "9",
+}
+
+# ISO 15919 writes a:i / a:u so that a + i is not read back as the diphthong ai
+_SEPARATED = ("இ", "உ")
+
+# Joiners only affect glyph shaping and carry no phonetic value
+_JOINERS = dict.fromkeys(map(ord, "\u200c\u200d"))
+
+TAMIL_RE = re.compile(r"[\u0b80-\u0bff]")
+
+
+def _build_table():
+    table = dict(VOWELS)
+    table.update(OTHER)
+    for v in _SEPARATED:
+        table["அ" + v] = "a:" + VOWELS[v]
+    for cons, base in CONSONANTS.items():
+        table[cons] = base + "a"
+        table[cons + VIRAMA] = base
+        for sign, vowel in VOWEL_SIGNS.items():
+            table[cons + sign] = base + vowel
+        for v in _SEPARATED:
+            table[cons + v] = base + "a:" + VOWELS[v]
+    return table
+
+
+_TABLE = _build_table()
+_PATTERN = re.compile(
+    "|".join(re.escape(k) for k in sorted(_TABLE, key=len, reverse=True))
+)
+
+
+def _sub(m):
+    return _TABLE[m.group(0)]
+
+
+def is_tamil(text) -> bool:
+    return bool(text) and TAMIL_RE.search(text) is not None
+
+
+@lru_cache(maxsize=8192)
+def transliterate(text: str) -> str:
+    """Transliterate Tamil script to ISO 15919; non-Tamil characters pass through."""
+    if not text:
+        return ""
+    text = unicodedata.normalize("NFC", text).translate(_JOINERS)
+    return _PATTERN.sub(_sub, text).strip()
+
+
+def transliterate_many(texts):
+    """Transliterate an iterable of strings, e.g. when backfilling saved words."""
+    return [transliterate(t) for t in texts]
+
+
+def resolve_transliteration(tamil, translit):
+    """Local transliteration of `tamil` when it is Tamil script, else `translit` unchanged."""
+    if is_tamil(tamil):
+        return transliterate(tamil.strip())
+    return translit